@@ -1,10 +1,13 @@
 """
 Version: 1.001.000"""
 
+import orjson
 import requests
 from time import sleep
 
 clickup_api_url = "https://api.clickup.com/api/v2/"
+# Shared keep-alive session so repeated ClickUp calls reuse their TLS connection
+clickup_session = requests.Session()
 
 
 def get_tasks(vault_values, list_id, include_closed=True, query_parameters=None):
@@ -47,7 +50,7 @@ def get_tasks(vault_values, list_id, include_closed=True, query_parameters=None)
         attempts = 0
         while attempts < max_attempts:
             try:
-                response = requests.get(url=url, headers=headers, params=params)
+                response = clickup_session.get(url=url, headers=headers, params=params)
                 response.raise_for_status()  # Raise an exception for HTTP errors
                 break
             except requests.exceptions.RequestException as e:
@@ -56,7 +59,7 @@ def get_tasks(vault_values, list_id, include_closed=True, query_parameters=None)
                     raise e
                 sleep(2 ** attempts)  # Exponential backoff
         
-        data = response.json()
+        data = orjson.loads(response.content)
         if "tasks" in data:
             tasks.extend(data["tasks"])
             if data["last_page"]:
@@ -91,7 +94,7 @@ def get_task(vault_values, task_id):
     """
     url = f"{clickup_api_url}task/{task_id}"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.get(url=url, headers=headers)
+    response = clickup_session.get(url=url, headers=headers)
     return response.json()
 
 
@@ -133,7 +136,7 @@ def create_task(vault_values, list_id, task_name="", args=None):
                 "DEV Error: Task name is required in arguments, or as pass-in value to create_task() function."
             )
 
-    response = requests.post(url=url, headers=headers, json=final_object)
+    response = clickup_session.post(url=url, headers=headers, json=final_object)
     if response.status_code != 200:
         print(response.json())
         raise ValueError("Error creating task")
@@ -143,7 +146,7 @@ def create_task(vault_values, list_id, task_name="", args=None):
 def update_task(vault_values, task_id, task_name, task_description):
     url = f"{clickup_api_url}task/{task_id}"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.put(
+    response = clickup_session.put(
         url=url, headers=headers, json={"name": task_name, "content": task_description}
     )
     return response.json()
@@ -152,20 +155,20 @@ def update_task(vault_values, task_id, task_name, task_description):
 def delete_task(vault_values, task_id):
     url = f"{clickup_api_url}task/{task_id}"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.delete(url=url, headers=headers)
+    response = clickup_session.delete(url=url, headers=headers)
     return response
 
 
 def get_lists(vault_values, space_id):
     url = f"{clickup_api_url}space/{space_id}/list"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.get(url=url, headers=headers)
+    response = clickup_session.get(url=url, headers=headers)
     return response.json()
 
 def get_folder(vault_values, folder_id):
     url = f"{clickup_api_url}folder/{folder_id}"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.get(url=url, headers=headers)
+    response = clickup_session.get(url=url, headers=headers)
     return response.json()
 
 def get_lists_in_folder(vault_values, folder_id):
@@ -175,42 +178,42 @@ def get_lists_in_folder(vault_values, folder_id):
 def create_folderless_list(vault_values, space_id, list_name):
     url = f"{clickup_api_url}space/{space_id}/list"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.post(url=url, headers=headers, json={"name": list_name})
+    response = clickup_session.post(url=url, headers=headers, json={"name": list_name})
     return response.json()
 
 
 def create_list_in_folder(vault_values, folder_id, list_name):
     url = f"{clickup_api_url}/folder/{folder_id}/list"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.post(url=url, headers=headers, json={"name": list_name})
+    response = clickup_session.post(url=url, headers=headers, json={"name": list_name})
     return response.json()
 
 
 def update_list(vault_values, list_id, list_name):
     url = f"{clickup_api_url}list/{list_id}"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.put(url=url, headers=headers, json={"name": list_name})
+    response = clickup_session.put(url=url, headers=headers, json={"name": list_name})
     return response.json()
 
 
 def delete_list(vault_values, list_id):
     url = f"{clickup_api_url}list/{list_id}"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.delete(url=url, headers=headers)
+    response = clickup_session.delete(url=url, headers=headers)
     return response.json()
 
 
 def get_accessible_custom_fields(vault_values, list_id):
     url = f"{clickup_api_url}list/{list_id}/field"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.get(url=url, headers=headers)
+    response = clickup_session.get(url=url, headers=headers)
     return response.json()
 
 
 def set_custom_field_value(vault_values, task_id, custom_field_id, value):
     url = f"{clickup_api_url}task/{task_id}/field/{custom_field_id}"
     headers = {"Authorization": vault_values["token"]}
-    response = requests.post(url=url, headers=headers, json={"value": value})
+    response = clickup_session.post(url=url, headers=headers, json={"value": value})
     return response.json()
 
 
@@ -250,7 +253,7 @@ def create_task_comment(
         "assignee": assignee_id,
         "notify_all": notify_all,
     }
-    response = requests.post(url=url, headers=headers, json=json)
+    response = clickup_session.post(url=url, headers=headers, json=json)
     return response.json()
 
 def get_custom_label_field_by_name(vault_values, list_id, custom_field_name):
@@ -286,12 +289,12 @@ def get_custom_dropdown_field_by_name(vault_values, list_id, custom_field_name):
 def get_doc_page(vault_values: dict, workspace_id: str, doc_id: str, page_id: str) -> dict:
     url = f"https://api.clickup.com/api/v3/workspaces/{workspace_id}/docs/{doc_id}/pages/{page_id}"
     headers = {"Authorization": vault_values["token"]}
-    resp = requests.get(url, headers=headers)
+    resp = clickup_session.get(url, headers=headers)
     resp.raise_for_status()
     return resp.json()
 
 def update_doc_page(vault_values: dict, workspace_id: str, doc_id: str, page_id: str, content: str):
     url = f"https://api.clickup.com/api/v3/workspaces/{workspace_id}/docs/{doc_id}/pages/{page_id}"
     headers = {"Authorization": vault_values["token"], "Content-Type": "application/json"}
-    resp = requests.put(url, headers=headers, json={"content": content})
+    resp = clickup_session.put(url, headers=headers, json={"content": content})
     resp.raise_for_status()
@@ -79,6 +79,21 @@ def get_dynamodb_item(table: Table, key: dict[str, Any]) -> dict[str, Any]|None:
         logging.error(f"Error retrieving item with key {key} from DynamoDB: {e}")
         raise
 
+def scan_dynamodb_table(table: Table, **scan_kwargs: Any) -> list[dict[str, Any]]:
+    """Scan every page of the DynamoDB table. A single scan call stops at 1 MB of data."""
+    items = []
+    try:
+        while True:
+            response = table.scan(**scan_kwargs)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                return items
+            scan_kwargs["ExclusiveStartKey"] = response['LastEvaluatedKey']
+
+    except Exception as e:
+        logging.error(f"Error scanning DynamoDB table: {e}")
+        raise
+
 def append_date_to_filename(file_name:str, with_time:bool=False):
     """
     # `append_date_to_filename` Function
@@ -1,11 +1,17 @@
 import json
+import orjson
 from typing import Tuple
 import requests
 import logging
+import time
 from jsonpath_ng.ext import parse
 from datetime import datetime, timedelta
 
 BASE_URL = "https://graph.microsoft.com/v1.0"
+# Graph upload session chunks must be multiples of 320 KiB
+UPLOAD_CHUNK_SIZE = 32 * 320 * 1024  # 10 MiB
+# Graph recommends a plain PUT to /content below 4 MiB; an upload session only pays off above that
+SIMPLE_UPLOAD_MAX_SIZE = 4 * 1024 * 1024
 
 class MsGraph:
     def __init__(self, client_id:str, client_secret:str, tenant:str, hostname:str):
@@ -23,6 +29,8 @@ class MsGraph:
             "client_secret_value": client_secret,
         }
         self.hostname = hostname
+        # Reuse one keep-alive connection pool for every Graph call made by this instance
+        self.session = requests.Session()
         self.access_token = self.request_access_token()
 
     def refresh_client_secret(self):
@@ -91,7 +99,7 @@ class MsGraph:
                 "endDateTime": new_secret_expiration,
             }
         }
-        response = requests.post(url, headers=headers, json=payload)
+        response = self.session.post(url, headers=headers, json=payload)
         response.raise_for_status()
         print(f"New client secret created: {new_secret_display_name}")
         print("====================================")
@@ -112,7 +120,7 @@ class MsGraph:
         ]
         
         payload = {"passwordCredentials": updated_credentials}
-        response = requests.patch(url, headers=headers, json=payload)
+        response = self.session.patch(url, headers=headers, json=payload)
         response.raise_for_status()
         print("Old credentials removed successfully.")
         print("====================================")
@@ -123,7 +131,7 @@ class MsGraph:
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
         }
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
         response.raise_for_status()
         return response.json()["passwordCredentials"]
 
@@ -159,14 +167,28 @@ class MsGraph:
             "client_secret": self.vault_values["client_secret_value"],
             "grant_type": "client_credentials",
         }
-        response = requests.post(url, headers=headers, data=data)
+        response = self.session.post(url, headers=headers, data=data)
         response.raise_for_status()  # This will raise an exception for HTTP error responses
-        access_token = response.json().get("access_token")
+        token = response.json()
+        access_token = token.get("access_token")
         if access_token:
+            self.access_token_expires_at = time.monotonic() + int(token.get("expires_in", 3599))
             return access_token
         else:
             raise ValueError("Failed to retrieve access token")
 
+    def ensure_access_token(self, min_validity_seconds=300):
+        """
+        Refreshes `access_token` only if it expires within `min_validity_seconds`.
+
+        :param int min_validity_seconds: How long the current token must still be valid to be kept.
+        :return: The current access token.
+        :rtype: str
+        """
+        if time.monotonic() + min_validity_seconds >= getattr(self, "access_token_expires_at", 0):
+            self.access_token = self.request_access_token()
+        return self.access_token
+
     def get_with_error_handling(self, url, headers, params=None):
         """
         # `get_with_error_handling` Function
@@ -193,7 +215,7 @@ class MsGraph:
         """
         print(f"Sending call to: {url}")
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.session.get(url, headers=headers, params=params)
             response.raise_for_status()
         except requests.exceptions.HTTPError as http_err:
             logging.error(f"HTTP error occurred: {http_err}")
@@ -332,7 +354,7 @@ class MsGraph:
         next_page = url
         while next_page is not None:
             response = self.get_with_error_handling(next_page, headers=headers)
-            data = response.json()
+            data = orjson.loads(response.content)
             folders_json.extend(data.get("value", []))
             next_page = data.get("@odata.nextLink")
 
@@ -361,10 +383,7 @@ class MsGraph:
         This function returns the name of the folder that starts with the specified string and the id of the folder.
         """
         print(f"Getting folder that starts with: {starts_with}")
-        folder_names = []
-        jsonpath_expression = parse(f"$[?(@.name =~ '{starts_with}.*')]")
-        for match in jsonpath_expression.find(folder_list_json):
-            folder_names.append(match.value)
+        folder_names = [item for item in folder_list_json if item.get("name", "").startswith(starts_with)]
         if len(folder_names) == 0:
             print("No folders found")
             return None, None
@@ -407,7 +426,7 @@ class MsGraph:
         next_page = url
         while next_page is not None:
             response = self.get_with_error_handling(next_page, headers=headers)
-            data = response.json()
+            data = orjson.loads(response.content)
             folders_json.extend(data.get("value", []))
             next_page = data.get("@odata.nextLink")
 
@@ -436,7 +455,7 @@ class MsGraph:
         headers = {
             'Authorization': f'Bearer {self.access_token}'
         }
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
         exists = (response.status_code == 200)
         
         return exists
@@ -557,7 +576,7 @@ class MsGraph:
             },
             "name": new_file_name
         }
-        response = requests.post(url, headers=headers, json=data)
+        response = self.session.post(url, headers=headers, json=data)
         try:
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
@@ -588,6 +607,30 @@ class MsGraph:
             raise ValueError(f"Error: Multiple IDs matched in {file_name} -> {file_dict_list}")
         return file_dict_list[0] if file_dict_list else None
 
+    def get_item_in_folder_by_name(self, drive_id, folder_id, item_name) -> dict|None:
+        """
+        Gets a single item from a folder by its exact name, addressing it by path instead of listing the folder.
+
+        :param str drive_id: The ID of the SharePoint drive.
+        :param str folder_id: The ID of the folder holding the item.
+        :param str item_name: The name of the file or folder.
+        :return: The item JSON, or None if the folder has no item with that name.
+        :rtype: dict|None
+
+        """
+        import urllib.parse
+        print(f"Getting item by name: {item_name}")
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json",
+        }
+        url = f"{BASE_URL}/drives/{drive_id}/items/{folder_id}:/{urllib.parse.quote(item_name)}"
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
     def move_file_to_folder(self, drive_id, file_id, new_folder_id, file_name=None) -> requests.models.Response:
         """
         Moves a file to a folder in SharePoint.
@@ -609,7 +652,7 @@ class MsGraph:
             },
             "name": file_name
         }
-        response = requests.patch(url, headers=headers, json=data)
+        response = self.session.patch(url, headers=headers, json=data)
         response.raise_for_status()
         return response    
     
@@ -624,8 +667,75 @@ class MsGraph:
         }
         url = f"{BASE_URL}/drives/{drive_id}/items/root:/{path}/{encoded_filename}:/content"
         try:
-            response = requests.put(url, headers=headers, data=binary_data)
+            response = self.session.put(url, headers=headers, data=binary_data)
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as http_err:
+            logging.error(f"HTTP error occurred: {http_err}")
+            raise
+        except requests.exceptions.RequestException as err:
+            logging.error(f"Request error occurred: {err}")
+            raise
+        except Exception as e:
+            logging.error(f"An error occurred: {e}")
+            raise
+        else:
+            return response
+
+    def upload_file_to_sharepoint_stream(self, drive_id, path, filename, file_stream, content_type="application/json", chunk_size=UPLOAD_CHUNK_SIZE) -> requests.models.Response:
+        """
+        Uploads a file-like object to SharePoint in chunks through a Graph upload session.
+
+        The stream is read one chunk at a time, so the whole file is never copied into a single request body.
+        Missing, empty and small (up to 4 MiB) streams go through `upload_file_to_sharepoint` as one PUT instead,
+        which saves the createUploadSession round trip.
+
+        :param str drive_id: The ID of the SharePoint drive.
+        :param str path: The folder path in the drive to upload into.
+        :param str filename: The name of the file to create or replace.
+        :param file_stream: A seekable binary stream, e.g. `io.BytesIO`.
+        :param str content_type: Content type used for the simple upload.
+        :param int chunk_size: Bytes per chunk. Must be a multiple of 320 KiB.
+        :return: The response object from the final chunk upload.
+        :rtype: requests.models.Response
+        """
+        if file_stream is None:
+            return self.upload_file_to_sharepoint(drive_id, path, filename, file_stream, content_type)
+
+        file_stream.seek(0, 2)
+        total_size = file_stream.tell()
+        file_stream.seek(0)
+        if total_size <= SIMPLE_UPLOAD_MAX_SIZE:
+            try:
+                return self.upload_file_to_sharepoint(drive_id, path, filename, file_stream, content_type)
+            finally:
+                file_stream.seek(0)
+
+        print(f"preparing to upload file in chunks: {filename}")
+        import urllib.parse
+        encoded_filename = urllib.parse.quote(filename)
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json",
+        }
+        url = f"{BASE_URL}/drives/{drive_id}/items/root:/{path}/{encoded_filename}:/createUploadSession"
+        payload = {"item": {"@microsoft.graph.conflictBehavior": "replace"}}
+        try:
+            response = self.session.post(url, headers=headers, json=payload)
             response.raise_for_status()
+            upload_url = response.json()["uploadUrl"]
+
+            # The upload URL is pre-authenticated, so no Authorization header is sent with the chunks
+            start = 0
+            while start < total_size:
+                chunk = file_stream.read(chunk_size)
+                end = start + len(chunk) - 1
+                chunk_headers = {
+                    "Content-Length": str(len(chunk)),
+                    "Content-Range": f"bytes {start}-{end}/{total_size}",
+                }
+                response = self.session.put(upload_url, headers=chunk_headers, data=chunk)
+                response.raise_for_status()
+                start = end + 1
         except requests.exceptions.HTTPError as http_err:
             logging.error(f"HTTP error occurred: {http_err}")
             raise
@@ -637,6 +747,8 @@ class MsGraph:
             raise
         else:
             return response
+        finally:
+            file_stream.seek(0)
 
     def download_file_from_sharepoint(self, graph_download_url: str) -> bytes:
         """
@@ -654,6 +766,28 @@ class MsGraph:
         response = self.get_with_error_handling(url, headers=headers)
         return response.content
 
+    def stream_file_from_sharepoint(self, graph_download_url: str, timeout: int = 30) -> requests.models.Response:
+        """
+        Opens a streaming download of a SharePoint file, so the caller can read the body as it arrives instead of holding it all.
+
+        Use the response as a context manager so the connection goes back to the pool once the body has been read.
+
+        :param str graph_download_url: The download URL for the file. Usually obtained from the `@microsoft.graph.downloadUrl` property of a file.
+        :param int timeout: Seconds to wait for the connection and for each read from the socket.
+        :return: The streaming response, with `raw` set to decode any transfer compression.
+        :rtype: requests.models.Response
+        """
+        # The download URL is pre-authenticated, so no Authorization header is sent
+        response = self.session.get(graph_download_url, stream=True, timeout=timeout)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as http_err:
+            response.close()
+            logging.error(f"HTTP error occurred: {http_err}")
+            raise
+        response.raw.decode_content = True
+        return response
+
     def send_email(self, payload, alternate_email_username_for_sending=None) -> Tuple[bool, requests.models.Response]:
         """
         Send an Email Using the Microsoft Graph API
@@ -719,7 +853,7 @@ class MsGraph:
         # post to https://graph.microsoft.com/v1.0/me/sendMail
         url = f"{BASE_URL}/users/{self.vault_values['username']}/sendMail"
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.session.post(url, headers=headers, json=payload)
             print(response)
             
             if(response.status_code != 202):
@@ -918,7 +1052,7 @@ class MsGraph:
             "Content-Type": "application/json",
         }
         url = f"{BASE_URL}/sites/{site_id}/lists/{list_id}/items"
-        response = requests.post(url, headers=headers, json=item_data)
+        response = self.session.post(url, headers=headers, json=item_data)
         response.raise_for_status()
         return response
 
@@ -1010,7 +1144,7 @@ class MsGraph:
         # url = f'{BASE_URL}/sites/{site_id}/drives/{drive_id}/root:/{file_path}:/workbook/tables/{table_name}/rows/add'
         url = f'{BASE_URL}/sites/{site_id}/drives/{drive_id}/items/{file_id}/workbook/tables/{table_id}/rows/add'
 
-        response = requests.post(url, headers=headers, json=data)
+        response = self.session.post(url, headers=headers, json=data)
         response.raise_for_status()
         return response
 
@@ -1046,7 +1180,7 @@ class MsGraph:
             "hasHeaders": True,
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = self.session.post(url, headers=headers, json=data)
         response.raise_for_status()
         return response
 
@@ -1086,7 +1220,7 @@ class MsGraph:
         }
         url = f'{BASE_URL}/sites/{site_id}/drives/{drive_id}/items/{file_id}/workbook/tables/{table_id}/'
 
-        response = requests.patch(url, headers=headers, json=new_table_properties)
+        response = self.session.patch(url, headers=headers, json=new_table_properties)
         response.raise_for_status()
         return response
 
@@ -3,6 +3,7 @@ import os
 import requests
 import mimetypes
 import logging
+import threading
 import time
 from functools import wraps
 from typing import Any, Callable
@@ -107,6 +108,10 @@ def retry_on_failure(
 class QuickBooksOnline:
     def __init__(self, vault_values: dict[str, str], oauth: bool = False) -> None:
         self.vault_values = vault_values
+        # One instance can be shared across threads; only one of them should rotate the refresh token at a time
+        self._token_lock = threading.Lock()
+        # Keep-alive session, so the client threads reuse pooled TLS connections to Intuit instead of reconnecting per call
+        self.session = requests.Session()
         if oauth:
             self.oauth_flow()
         else:
@@ -181,21 +186,22 @@ class QuickBooksOnline:
     
         token_url = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
         auth = (self.vault_values["client_id"], self.vault_values["client_secret"])
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": self.vault_values["refresh_token"],
-        }
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/x-www-form-urlencoded",
         }
 
         try:
-            response = requests.post(token_url, auth=auth, data=data, headers=headers, timeout=30)
-            response.raise_for_status()
-            token = response.json()
-            self.vault_values["access_token"] = token["access_token"]
-            self.vault_values["refresh_token"] = token["refresh_token"]
+            with self._token_lock:
+                data = {
+                    "grant_type": "refresh_token",
+                    "refresh_token": self.vault_values["refresh_token"],
+                }
+                response = self.session.post(token_url, auth=auth, data=data, headers=headers, timeout=30)
+                response.raise_for_status()
+                token = response.json()
+                self.vault_values["access_token"] = token["access_token"]
+                self.vault_values["refresh_token"] = token["refresh_token"]
             logger.info("Successfully refreshed OAuth token")
         except requests.exceptions.HTTPError as e:
             error_detail = e.response.text if e.response else str(e)
@@ -264,7 +270,7 @@ class QuickBooksOnline:
         url = f"{BASE_URL}/v3/company/{self.vault_values['realm_id']}/query"
         headers = self._create_headers()
         params = {"query": query, "minorversion": minorversion}
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = self.session.get(url, headers=headers, params=params, timeout=30)
         response.raise_for_status()
         return response.json()
 
@@ -299,7 +305,7 @@ class QuickBooksOnline:
 
         url = f"{BASE_URL}/v3/company/{self.vault_values['realm_id']}/customer"
         headers = self._create_headers()
-        response = requests.post(url, headers=headers, json=customer, timeout=30)
+        response = self.session.post(url, headers=headers, json=customer, timeout=30)
         response.raise_for_status()
         return response.json()
 
@@ -327,7 +333,7 @@ class QuickBooksOnline:
         """
         url = f"{BASE_URL}/v3/company/{self.vault_values['realm_id']}/recurringtransaction"
         headers = self._create_headers()
-        response = requests.get(url, headers=headers, timeout=30)
+        response = self.session.get(url, headers=headers, timeout=30)
         response.raise_for_status()
         return response.json()
 
@@ -415,7 +421,7 @@ class QuickBooksOnline:
         """
         url = f"{BASE_URL}/v3/company/{self.vault_values['realm_id']}/recurringtransaction"
         headers = self._create_headers()
-        response = requests.post(url, headers=headers, json=recurring_transaction, timeout=30)
+        response = self.session.post(url, headers=headers, json=recurring_transaction, timeout=30)
         response.raise_for_status()
         return response.json()
 
@@ -471,7 +477,7 @@ class QuickBooksOnline:
         url = f"{BASE_URL}/v3/company/{self.vault_values['realm_id']}/invoice"
         headers = self._create_headers()
         query_params = {"minorversion": minorversion}
-        response = requests.post(url, headers=headers, json=invoice, params=query_params, timeout=30)
+        response = self.session.post(url, headers=headers, json=invoice, params=query_params, timeout=30)
         response.raise_for_status()
         return response.json()
 
@@ -502,7 +508,7 @@ class QuickBooksOnline:
         headers = self._create_headers()
         headers['Content-Type'] = "application/octet-stream"
         query_params = {"minorversion": minorversion}
-        response = requests.post(url, headers=headers, params=query_params, timeout=30)
+        response = self.session.post(url, headers=headers, params=query_params, timeout=30)
         response.raise_for_status()
         return response.json()
 
@@ -532,7 +538,7 @@ class QuickBooksOnline:
         url = f"{BASE_URL}/v3/company/{self.vault_values['realm_id']}/query"
         headers = self._create_headers()
         params = {"query": query, "minorversion": minorversion}
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = self.session.get(url, headers=headers, params=params, timeout=30)
         response.raise_for_status()
         return response.json()
 
@@ -588,14 +594,14 @@ class QuickBooksOnline:
                     'file_metadata_01': ('metadata.json', json.dumps(metadata), 'application/json'),
                     'file_content_01': (file_name, f, content_type)
                 }
-                response = requests.post(url, headers=headers, params=params, files=files, timeout=60)
+                response = self.session.post(url, headers=headers, params=params, files=files, timeout=60)
         else:
             # file_data is a BytesIO object (or similar file-like object)
             files = {
                 'file_metadata_01': ('metadata.json', json.dumps(metadata), 'application/json'),
                 'file_content_01': (file_name, file_data, content_type)
             }
-            response = requests.post(url, headers=headers, params=params, files=files, timeout=60)
+            response = self.session.post(url, headers=headers, params=params, files=files, timeout=60)
 
         response.raise_for_status()
         return response.json()
@@ -4,27 +4,64 @@ from datetime import datetime, timezone
 from urllib.parse import urlparse
 
 import boto3
+import orjson
 import pyodbc
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import apd_common
 
 ROBOCORP_BASE_URL = "https://cloud.robocorp.com/api/v1"
 
+MERGE_PROCESSES_SQL = """
+MERGE dbo.dim_processes AS target
+USING (SELECT ? AS process_id, ? AS process_name, ? AS workspace_id,
+              ? AS workspace_text_id, ? AS workspace_name, ? AS client_number,
+              ? AS client_name, ? AS last_synced_at) AS source
+ON target.process_id = source.process_id
+WHEN MATCHED THEN
+    UPDATE SET
+        process_name = source.process_name,
+        workspace_id = source.workspace_id,
+        workspace_text_id = source.workspace_text_id,
+        workspace_name = source.workspace_name,
+        client_number = source.client_number,
+        client_name = source.client_name,
+        last_synced_at = source.last_synced_at
+WHEN NOT MATCHED THEN
+    INSERT (process_id, process_name, workspace_id, workspace_text_id,
+            workspace_name, client_number, client_name, last_synced_at)
+    VALUES (source.process_id, source.process_name, source.workspace_id,
+            source.workspace_text_id, source.workspace_name, source.client_number,
+            source.client_name, source.last_synced_at);
+"""
+
+
+def _build_robocorp_session() -> requests.Session:
+    """Create a session that retries rate-limited and transient Robocorp failures with backoff."""
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(max_retries=retry))
+    return session
+
+
+_robocorp_session = _build_robocorp_session()
 
 def sync_robocorp_processes_to_sql() -> bool:
     """Fetch Robocorp process/assistant data and upsert into Azure SQL Server."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(levelname)s: %(message)s',
-        force=True
-    )
     logging.info("Starting Robocorp process sync to Azure SQL...")
 
     try:
         sql_config = _get_sql_config()
     except ValueError as e:
-        logging.error(f"Configuration error: {e}")
+        logging.error("Configuration error: %s", e)
         return False
 
     aws_region = os.environ.get("AWS_REGION", "us-west-2")
@@ -35,22 +72,29 @@ def sync_robocorp_processes_to_sql() -> bool:
         robocorp_vault = apd_common.get_secrets("ROBOCORP_API_SECRET_NAME", aws_secretsmanager)
         client_orgs_table = apd_common.get_dynamodb_table("DYNAMODB_TABLE_ROBOCORP_CLIENTS", aws_dynamodb)
     except Exception as e:
-        logging.error(f"Failed to initialize AWS resources: {e}")
+        logging.error("Failed to initialize AWS resources: %s", e)
         return False
 
     try:
         sql_connection = _connect_to_azure_sql(sql_config)
+        sql_connection.autocommit = False
         logging.info("Connected to Azure SQL Server")
     except Exception as e:
-        logging.error(f"Failed to connect to Azure SQL Server: {e}")
+        logging.error("Failed to connect to Azure SQL Server: %s", e)
         return False
 
     success_count = 0
-    error_count = 0
+    # Clients that could not be synced; they are reported but do not abort the run's transaction
+    failed_clients: list[str] = []
+
+    cursor = None
 
     try:
-        clients = client_orgs_table.scan()['Items']
-        logging.info(f"Found {len(clients)} clients in DynamoDB")
+        cursor = sql_connection.cursor()
+        cursor.fast_executemany = True
+
+        clients = apd_common.scan_dynamodb_table(client_orgs_table)
+        logging.info("Found %d clients in DynamoDB", len(clients))
 
         for item in clients:
             client_number = item['client_number']
@@ -58,28 +102,38 @@ def sync_robocorp_processes_to_sql() -> bool:
 
             robocorp_api_key = robocorp_vault.get(client_number)
             if not robocorp_api_key:
-                logging.warning(f"No Robocorp API key for client {client_number}, skipping")
-                error_count += 1
+                logging.warning("No Robocorp API key for client %s, skipping", client_number)
+                failed_clients.append(client_number)
                 continue
 
             try:
-                _sync_client_processes(
-                    sql_connection, client_number, workspace_id, robocorp_api_key
-                )
-                success_count += 1
+                rows = _fetch_client_processes(client_number, workspace_id, robocorp_api_key)
             except Exception as e:
-                logging.error(f"Error syncing client {client_number}: {e}")
-                error_count += 1
+                logging.error("Error syncing client %s: %s", client_number, e)
+                failed_clients.append(client_number)
+                continue
+
+            # Database errors are not per-client recoverable, so let them roll back the whole run
+            if rows:
+                _upsert_processes(cursor, rows)
+                logging.info("  Upserted %d rows for client %s", len(rows), client_number)
+            success_count += 1
 
-        logging.info(f"Sync complete. Success: {success_count}, Errors: {error_count}")
+        sql_connection.commit()
+        logging.info("Sync complete. Success: %d, Errors: %d", success_count, len(failed_clients))
+        if failed_clients:
+            logging.warning("Clients not synced: %s", ", ".join(failed_clients))
     except Exception as e:
-        logging.error(f"Error during sync process: {e}")
+        logging.error("Error during sync process: %s", e)
+        sql_connection.rollback()
         return False
     finally:
+        if cursor is not None:
+            cursor.close()
         sql_connection.close()
         logging.info("Azure SQL connection closed")
 
-    return error_count == 0
+    return not failed_clients
 
 
 def _get_sql_config() -> dict[str, str]:
@@ -121,13 +175,12 @@ def _connect_to_azure_sql(config: dict[str, str]) -> pyodbc.Connection:
     return pyodbc.connect(connection_string)
 
 
-def _sync_client_processes(
-    sql_connection: pyodbc.Connection,
+def _fetch_client_processes(
     client_number: str,
     workspace_id: str,
     robocorp_api_key: str,
-) -> None:
-    """Sync all processes and assistants for a single client."""
+) -> list[dict]:
+    """Fetch all processes and assistants for a single client as dim_processes rows."""
     header = {
         "Content-Type": "application/json",
         "Authorization": f"RC-WSKEY {robocorp_api_key}",
@@ -138,7 +191,7 @@ def _sync_client_processes(
     workspace_text_id = _parse_workspace_text_id(workspace_info.get("url", ""))
     client_name = workspace_info.get("organization", {}).get("name", "")
 
-    logging.info(f"  Client {client_number}: workspace={workspace_name}, org={client_name}")
+    logging.info("  Client %s: workspace=%s, org=%s", client_number, workspace_name, client_name)
 
     unattended_processes = _get_paginated_data(
         f"{ROBOCORP_BASE_URL}/workspaces/{workspace_id}/processes", header
@@ -148,7 +201,7 @@ def _sync_client_processes(
     )
 
     logging.info(
-        f"  Found {len(unattended_processes)} processes, {len(assistant_processes)} assistants"
+        "  Found %d processes, %d assistants", len(unattended_processes), len(assistant_processes)
     )
 
     all_rows = []
@@ -163,17 +216,15 @@ def _sync_client_processes(
             "client_name": client_name,
         })
 
-    if all_rows:
-        _upsert_processes(sql_connection, all_rows)
-        logging.info(f"  Upserted {len(all_rows)} rows for client {client_number}")
+    return all_rows
 
 
 def _get_workspace_info(workspace_id: str, header: dict[str, str]) -> dict:
     """Fetch workspace metadata from Robocorp API."""
     url = f"{ROBOCORP_BASE_URL}/workspaces/{workspace_id}"
-    response = requests.get(url, headers=header)
+    response = _robocorp_session.get(url, headers=header)
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
 
 
 def _parse_workspace_text_id(workspace_url: str) -> str:
@@ -193,9 +244,9 @@ def _get_paginated_data(url: str, header: dict[str, str]) -> list[dict]:
     query_params = {"limit": 500}
 
     while url:
-        response = requests.get(url, headers=header, params=query_params)
+        response = _robocorp_session.get(url, headers=header, params=query_params)
         response.raise_for_status()
-        response_json = response.json()
+        response_json = orjson.loads(response.content)
         results.extend(response_json.get("data", []))
         url = response_json.get("next") if response_json.get("has_more") else None
         query_params = {}
@@ -203,54 +254,37 @@ def _get_paginated_data(url: str, header: dict[str, str]) -> list[dict]:
     return results
 
 
-def _upsert_processes(connection: pyodbc.Connection, processes: list[dict]) -> None:
-    """Upsert process records into dbo.dim_processes using MERGE."""
-    merge_sql = """
-    MERGE dbo.dim_processes AS target
-    USING (SELECT ? AS process_id, ? AS process_name, ? AS workspace_id,
-                  ? AS workspace_text_id, ? AS workspace_name, ? AS client_number,
-                  ? AS client_name, ? AS last_synced_at) AS source
-    ON target.process_id = source.process_id
-    WHEN MATCHED THEN
-        UPDATE SET
-            process_name = source.process_name,
-            workspace_id = source.workspace_id,
-            workspace_text_id = source.workspace_text_id,
-            workspace_name = source.workspace_name,
-            client_number = source.client_number,
-            client_name = source.client_name,
-            last_synced_at = source.last_synced_at
-    WHEN NOT MATCHED THEN
-        INSERT (process_id, process_name, workspace_id, workspace_text_id,
-                workspace_name, client_number, client_name, last_synced_at)
-        VALUES (source.process_id, source.process_name, source.workspace_id,
-                source.workspace_text_id, source.workspace_name, source.client_number,
-                source.client_name, source.last_synced_at);
+def _upsert_processes(cursor: pyodbc.Cursor, processes: list[dict]) -> None:
+    """Upsert process records into dbo.dim_processes using MERGE.
+
+    Does not commit; the caller owns the cursor and the transaction.
     """
+    current_time = datetime.now(timezone.utc)
+    params = [
+        (
+            process["process_id"],
+            process["process_name"],
+            process["workspace_id"],
+            process["workspace_text_id"],
+            process["workspace_name"],
+            process["client_number"],
+            process["client_name"],
+            current_time,
+        )
+        for process in processes
+    ]
 
-    cursor = connection.cursor()
     try:
-        current_time = datetime.now(timezone.utc)
-        for process in processes:
-            cursor.execute(
-                merge_sql,
-                process["process_id"],
-                process["process_name"],
-                process["workspace_id"],
-                process["workspace_text_id"],
-                process["workspace_name"],
-                process["client_number"],
-                process["client_name"],
-                current_time,
-            )
-        connection.commit()
+        cursor.executemany(MERGE_PROCESSES_SQL, params)
     except Exception as e:
-        logging.error(f"Error during upsert: {e}")
-        connection.rollback()
+        logging.error("Error during upsert: %s", e)
         raise
-    finally:
-        cursor.close()
 
 
 if __name__ == "__main__":
+    # The container entrypoint configures logging itself; only a direct run sets it up here
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(levelname)s: %(message)s',
+    )
     sync_robocorp_processes_to_sql()
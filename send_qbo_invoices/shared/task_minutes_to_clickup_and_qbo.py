@@ -1,15 +1,21 @@
+import functools
 import logging
-import math
 import os
-import time
 import json
+import threading
 from datetime import datetime, timezone
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas
+import numpy
+import orjson
+import pyarrow
+import pyarrow.csv
 from dateutil.relativedelta import relativedelta
 import io
-import ast
-from openpyxl import load_workbook, Workbook
+import xlsxwriter
+from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 from openpyxl.chart import LineChart, Reference, BarChart
 from openpyxl.chart.layout import Layout, ManualLayout
@@ -22,6 +28,10 @@ import apd_clickup as clickup
 import boto3
 import apd_common
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Filtered/selected frames share buffers until written to, so they no longer need defensive .copy() calls
+pandas.set_option("mode.copy_on_write", True)
 
 # Configuration (loaded from environment variables)
 UPLOAD_TO_SHAREPOINT = os.environ.get("UPLOAD_TO_SHAREPOINT", "false").lower() == "true"
@@ -30,6 +40,10 @@ UPDATE_CLICKUP = os.environ.get("UPDATE_CLICKUP", "false").lower() == "true"
 LOWER_CLIENT_ID = int(os.environ.get("LOWER_CLIENT_ID", "10000"))
 UPPER_CLIENT_ID = int(os.environ.get("UPPER_CLIENT_ID", "20030"))
 NET_30_DAYS_CLIENTS = os.environ.get("NET_30_DAYS_CLIENTS", "").split(",")
+MAX_CLIENT_WORKERS = int(os.environ.get("MAX_CLIENT_WORKERS", "8"))
+STEP_RUN_FETCH_WORKERS = int(os.environ.get("STEP_RUN_FETCH_WORKERS", "16"))
+EXPORT_FORMAT = os.environ.get("EXPORT_FORMAT", "xlsx").lower()
+PARQUET_COMPRESSION = os.environ.get("PARQUET_COMPRESSION", "zstd").lower()
 
 def get_billing_reference_date() -> datetime:
     """Get billing reference date from environment variable or default to first day of prior month."""
@@ -53,45 +67,85 @@ DOCUMENT_LIBRARY_NAME = "Documents"
 APD_CLIENT_ID = "10000"
 SUB_FOLDER_NAME = "Minutes"
 BASE_PATH = f"10000 - Automata Practice Development/{SUB_FOLDER_NAME}"
+MSGRAPH_TOKEN_LOCK = threading.Lock()
+SHAREPOINT_DRIVE_LOCK = threading.Lock()
+SHAREPOINT_DRIVE_CACHE: dict[tuple[str, str], tuple[str, str]] = {}
+QBO_QUERY_PAGE_SIZE = 1000
+CLICKUP_ACCOUNT_FILTER_LIMIT = 5
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_FILE_TYPES = {
+    "xlsx": (".xlsx", XLSX_CONTENT_TYPE),
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+EXPORT_FILE_EXTENSION, EXPORT_CONTENT_TYPE = EXPORT_FILE_TYPES.get(EXPORT_FORMAT, EXPORT_FILE_TYPES["xlsx"])
+# Day zero of Excel's 1900 date system, as used for serial date numbers
+EXCEL_EPOCH = pandas.Timestamp("1899-12-30")
+# Columns of the per-client assistant runs export, built from the Robocorp assistant-runs API
+ASSISTANT_EXPORT_COLUMNS = ["Organization ID", "Organization name", "Process ID", "Process Name", "started_at", "duration", "Process total run minutes used"]
+# Columns of the Robocorp account usage CSV that are used for billing and the per-client export
+UNATTENDED_EXPORT_COLUMNS = ["Organization ID", "Organization name", "Process name", "Process ID", "Process total run minutes used", "Process On-demand run minutes used"]
+# Identifier and name columns are read as text so IDs are never inferred as numbers; minute columns keep their inferred numeric type
+UNATTENDED_TEXT_COLUMNS = {"Organization ID": str, "Organization name": str, "Process name": str, "Process ID": str}
+
+def build_robocorp_session() -> requests.Session:
+    """Create a keep-alive session that retries rate-limited and transient Robocorp failures with backoff."""
+    retry = Retry(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+    )
+    session = requests.Session()
+    # Enough pooled connections for every client's assistant and unattended fetches plus every step-run worker to keep one open.
+    # pool_block makes any extra caller wait for a pooled connection rather than open a throwaway one.
+    pool_size = 2 * MAX_CLIENT_WORKERS + STEP_RUN_FETCH_WORKERS
+    session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=True))
+    return session
+
+# Shared by all client and step-run worker threads
+ROBOCORP_SESSION = build_robocorp_session()
+
+# strftime flag for a month without a leading zero differs between POSIX and Windows
+UNPADDED_MONTH_FORMAT = "%Y-%#m" if os.name == "nt" else "%Y-%-m"
 
-@dataclass
+@dataclass(frozen=True)
 class BillingPeriodConfig:
-    """Configuration for billing periods."""
+    """Configuration for billing periods. Frozen, so each derived date is computed once and cached."""
     reference_date: datetime
     
-    @property
+    @functools.cached_property
     def current_period_start(self) -> datetime:
         return self.reference_date
     
-    @property
+    @functools.cached_property
     def current_period_end(self) -> datetime:
         return (self.reference_date + relativedelta(months=1, days=-1)).replace(
             hour=23, minute=59, second=59
         )
     
-    @property
+    @functools.cached_property
     def prior_period_start(self) -> datetime:
         return self.reference_date - relativedelta(months=1)
     
-    @property
+    @functools.cached_property
     def prior_period_end(self) -> datetime:
         return (self.reference_date - relativedelta(days=1)).replace(
             hour=23, minute=59, second=59
         )
     
-    @property
+    @functools.cached_property
     def sharepoint_file_date(self) -> str:
         """Format: YYYY-M with zero-indexed month for Robocorp (e.g., '2025-0' for January 2025)"""
         year = self.current_period_start.year
         month = self.current_period_start.month - 1  # Zero-indexed for Robocorp
         return f"{year}-{month}"
     
-    @property
+    @functools.cached_property
     def sharepoint_report_date(self) -> str:
         """Format: Month YYYY (e.g., 'September 2025')"""
-        return self.current_period_start.strftime("%Y-%-m" if os.name != "nt" else "%Y-%#m")
+        return self.current_period_start.strftime(UNPADDED_MONTH_FORMAT)
     
-    @property
+    @functools.cached_property
     def sharepoint_minutes_file_date(self) -> str:
         """Format: YYYY-MM (e.g., '2025-01' for January 2025)"""
         return self.current_period_start.strftime("%Y-%m")
@@ -114,10 +168,14 @@ def process_all_clients():
     # Get the secrets from the vault
     try:
         aws_secretsmanager = boto3.client("secretsmanager", region_name=aws_region)
-        quickbooks_online_vault = apd_common.get_secrets("QBO_SECRET_NAME", aws_secretsmanager)
-        clickup_vault = apd_common.get_secrets("CLICKUP_SECRET_NAME", aws_secretsmanager)
-        robocorp_vault = apd_common.get_secrets("ROBOCORP_API_SECRET_NAME", aws_secretsmanager)
-        msgraph_vault = apd_common.get_secrets("MSGRAPH_SECRET_NAME", aws_secretsmanager)
+        # The four secrets are independent lookups, so fetch them together (boto3 clients are thread-safe)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            quickbooks_online_vault, clickup_vault, robocorp_vault, msgraph_vault = executor.map(
+                lambda secret_name_env: apd_common.get_secrets(secret_name_env, aws_secretsmanager),
+                ["QBO_SECRET_NAME", "CLICKUP_SECRET_NAME", "ROBOCORP_API_SECRET_NAME", "MSGRAPH_SECRET_NAME"],
+            )
+        # One QBO instance (and one token refresh) for the whole run; it is shared by the client threads
+        quickbooks_online_instance = quickbooks_online.QuickBooksOnline(quickbooks_online_vault)
         msgraph_instance = msgraph.MsGraph(
                 tenant=msgraph_vault["tenant_id"],
                 client_id=msgraph_vault["client_id"],
@@ -130,69 +188,137 @@ def process_all_clients():
         logging.error(f"Failed to initialize instances: {e}")
         return False
 
-    unattended_data = get_unattended_data_from_sharepoint(msgraph_instance)
-    
-    for item in client_orgs_table.scan()['Items']:
-        client_number = item['client_number']
-        organization_id = item['organization_id']
-        workspace_id = item['workspace_id']
-        robocorp_control_room_api_key = robocorp_vault[client_number]
-        
-        logging.info(f"Processing client number: {client_number}")
-        
-        if not (LOWER_CLIENT_ID <= int(client_number) < UPPER_CLIENT_ID):
-            continue
-        
-        if client_number == "10000":
-            logging.info("Skipping Automata client number")
-            continue
-
-        header = {
+    eligible_clients = get_eligible_clients(client_orgs_table)
+
+    # The run-wide lookups hit three unrelated services, so fetch them side by side
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        unattended_data_future = executor.submit(get_unattended_data_from_sharepoint, msgraph_instance)
+        clickup_organizations_future = executor.submit(
+            get_clickup_organizations_by_account,
+            clickup_vault,
+            [item['client_number'] for item in eligible_clients],
+        )
+        quickbooks_customers_future = executor.submit(get_quickbooks_customers_by_account, quickbooks_online_instance)
+    unattended_data = unattended_data_future.result()
+    clickup_organizations = clickup_organizations_future.result()
+    quickbooks_customers = quickbooks_customers_future.result()
+
+    # Split the unattended export once so each client picks up its rows by key instead of rescanning the whole frame
+    unattended_data_by_organization: dict[str, pandas.DataFrame] = dict(iter(unattended_data.groupby("Organization ID", sort=False)))
+
+    # Each client is independent and dominated by network I/O, so overlap them. Threads rather than processes:
+    # the QBO token refresh is serialized with an in-process lock and the Graph session is shared across clients.
+    # The helper pools live only for this run and are shut down after the client pool has drained:
+    # - one step-run pool, so concurrent clients share STEP_RUN_FETCH_WORKERS instead of multiplying it
+    # - each client thread hands its unattended run history fetch to the unattended pool, one at a time,
+    #   so it never needs more workers than there are client threads
+    with (
+        ThreadPoolExecutor(max_workers=STEP_RUN_FETCH_WORKERS, thread_name_prefix="step-runs") as step_run_executor,
+        ThreadPoolExecutor(max_workers=MAX_CLIENT_WORKERS, thread_name_prefix="unattended-runs") as unattended_run_executor,
+        ThreadPoolExecutor(max_workers=max(1, min(MAX_CLIENT_WORKERS, len(eligible_clients)))) as executor,
+    ):
+        futures = {
+            executor.submit(
+                process_client,
+                item,
+                unattended_data_by_organization,
+                robocorp_vault,
+                clickup_vault,
+                clickup_organizations,
+                quickbooks_online_instance,
+                quickbooks_customers,
+                msgraph_instance,
+                unattended_run_executor,
+                step_run_executor,
+            ): item['client_number']
+            for item in eligible_clients
+        }
+        # One client's failure shouldn't stop the others from being billed; report them all at the end
+        failed_clients: list[str] = []
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(f"Error processing client {futures[future]}: {e}")
+                failed_clients.append(futures[future])
+
+    if failed_clients:
+        logging.warning(f"Clients not processed: {', '.join(sorted(failed_clients))}")
+        return False
+
+    logging.info("Completed ClickUp and QBO process...")
+    return True
+
+def get_eligible_clients(client_orgs_table) -> list[dict[str, str]]:
+    # Only the three identifiers are needed, so project them and filter the range before any client work is queued
+    items = apd_common.scan_dynamodb_table(client_orgs_table, ProjectionExpression="client_number, organization_id, workspace_id")
+
+    eligible_clients = [item for item in items if LOWER_CLIENT_ID <= int(item['client_number']) < UPPER_CLIENT_ID]
+    if any(item['client_number'] == "10000" for item in eligible_clients):
+        logging.info("Skipping Automata client number")
+        eligible_clients = [item for item in eligible_clients if item['client_number'] != "10000"]
+
+    return sorted(eligible_clients, key=lambda item: int(item['client_number']))
+
+def process_client(item: dict[str, str], unattended_data_by_organization: dict[str, pandas.DataFrame], robocorp_vault: dict[str, str], clickup_vault: dict[str, str], clickup_organizations: dict[str, dict], quickbooks_online_instance: quickbooks_online.QuickBooksOnline, quickbooks_customers: dict[str, dict], msgraph_instance: msgraph.MsGraph, unattended_run_executor: ThreadPoolExecutor, step_run_executor: ThreadPoolExecutor):
+    """Build the usage report, invoice and SharePoint uploads for a single client. Runs on a worker thread."""
+    client_number = item['client_number']
+    organization_id = item['organization_id']
+    workspace_id = item['workspace_id']
+    robocorp_control_room_api_key = robocorp_vault[client_number]
+
+    logging.info(f"Processing client number: {client_number}")
+
+    header = {
         "Content-Type": "application/json",
         "Authorization": f"RC-WSKEY {robocorp_control_room_api_key}"
-        }
-        
+    }
 
-        total_runtime_prior_month_unattended, unattended_export_file_stream, organization_name = get_unattended_data_from_spreadsheet(unattended_data, client_number, organization_id)
+    total_runtime_prior_month_unattended, unattended_export_file_stream, organization_name = get_unattended_data_from_spreadsheet(unattended_data_by_organization, client_number, organization_id)
 
-        total_runtime_prior_month_assistant, assistant_export_file_stream, dataframe_prior_month_assistant = get_assistant_runs(
-            BILLING_CONFIG.prior_period_end,
-            BILLING_CONFIG.prior_period_start,
-            workspace_id,
-            header,
-            organization_name
-        )
+    # Assistant pages are cursor-chained and must be fetched in order, so overlap them with the unattended run history instead
+    unattended_runs_future = unattended_run_executor.submit(
+        get_unattended_runs,
+        workspace_id,
+        header,
+        step_run_executor,
+    )
+    total_runtime_prior_month_assistant, assistant_export_file_stream, dataframe_prior_month_assistant = get_assistant_runs(
+        BILLING_CONFIG.prior_period_end,
+        BILLING_CONFIG.prior_period_start,
+        workspace_id,
+        header,
+        organization_name
+    )
+    dataframe_prior_months_unattended = unattended_runs_future.result()
 
-        dataframe_prior_months_unattended = get_unattended_runs(
-            workspace_id,
-            header,  
-        )
+    total_runtime_prior_month = total_runtime_prior_month_assistant + total_runtime_prior_month_unattended
+    logging.info(f"Total runtime for client {client_number} for prior month: {total_runtime_prior_month} minutes")
 
-        total_runtime_prior_month = total_runtime_prior_month_assistant + total_runtime_prior_month_unattended
-        logging.info(f"Total runtime for client {client_number} for prior month: {total_runtime_prior_month} minutes")
-        
-        _, monthly_rate, included_minutes, consumption_rate, day_to_bill, service_type, client_type, billing_cc = (
-            send_data_to_clickup(clickup_vault, client_number, total_runtime_prior_month)
-        )
-        
-        report_datastream = build_runtime_report(client_number, dataframe_prior_months_unattended, dataframe_prior_month_assistant, included_minutes, consumption_rate)
-        
-        invoice_json = generate_invoice(
-            quickbooks_online_vault,
-            client_number,
-            monthly_rate,
-            included_minutes,
-            consumption_rate,
-            total_runtime_prior_month,
-            day_to_bill,
-            service_type,
-            client_type,
-            billing_cc,
-        )
+    _, monthly_rate, included_minutes, consumption_rate, day_to_bill, service_type, client_type, billing_cc = (
+        send_data_to_clickup(clickup_vault, clickup_organizations, client_number, total_runtime_prior_month)
+    )
+
+    report_datastream = build_runtime_report(client_number, dataframe_prior_months_unattended, dataframe_prior_month_assistant, included_minutes, consumption_rate)
+
+    invoice_json = generate_invoice(
+        quickbooks_online_instance,
+        quickbooks_customers,
+        client_number,
+        monthly_rate,
+        included_minutes,
+        consumption_rate,
+        total_runtime_prior_month,
+        day_to_bill,
+        service_type,
+        client_type,
+        billing_cc,
+    )
 
-        if report_datastream and invoice_json:
-            attach_detail_runtime_to_invoice(quickbooks_online_vault, invoice_json, report_datastream)
+    if report_datastream and invoice_json:
+        attach_detail_runtime_to_invoice(quickbooks_online_instance, invoice_json, report_datastream)
 
+    try:
         send_files_to_sharepoint(
             msgraph_instance,
             client_number,
@@ -200,48 +326,48 @@ def process_all_clients():
             unattended_export_file_stream,
             report_datastream,
         )
-        
-        print("=====================================")
-    logging.info("Completed ClickUp and QBO process...")
-    return True
+    finally:
+        # The uploads are the last readers, so free the buffers here instead of holding them until the worker moves on
+        for file_stream in (assistant_export_file_stream, unattended_export_file_stream, report_datastream):
+            if file_stream is not None:
+                file_stream.close()
+
+    logging.info(f"Completed client number: {client_number}")
 
 def send_files_to_sharepoint(msgraph_instance: msgraph.MsGraph, client_number: str, assistant_export_file_stream: str, unattended_export_file_stream: str, report_datastream: str):
-    # Re-Authenticate and get access token
-    msgraph_instance.access_token = msgraph_instance.request_access_token()
-    # Get the site ID and drive ID for the Sharepoint site
-    _, drive_id = get_site_id_and_drive_id(msgraph_instance, SHAREPOINT_SITE_NAME, DOCUMENT_LIBRARY_NAME)
-    
     if UPLOAD_TO_SHAREPOINT:
-        # Upload the files to the subfolder
-        attended_export_filename = client_number + "_assistant_processes_" + BILLING_CONFIG.sharepoint_minutes_file_date + ".xlsx"
-        msgraph_instance.upload_file_to_sharepoint(
-                drive_id,
-                BASE_PATH,
-                attended_export_filename,
-                assistant_export_file_stream,
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )    
-        # Upload unattended processes file
-        unattended_export_filename = client_number + "_unattended_processes_" + BILLING_CONFIG.sharepoint_minutes_file_date + ".xlsx"
-        msgraph_instance.upload_file_to_sharepoint(
-                drive_id,
-                BASE_PATH,
-                unattended_export_filename,
-                unattended_export_file_stream,
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-    
-        # Upload the files to the subfolder
+        # Re-Authenticate only when the token is close to expiring. The Graph instance is shared by the client threads, so check one at a time.
+        with MSGRAPH_TOKEN_LOCK:
+            msgraph_instance.ensure_access_token()
+        # Get the site ID and drive ID for the Sharepoint site (cached after the first lookup of the run)
+        _, drive_id = get_site_id_and_drive_id(msgraph_instance, SHAREPOINT_SITE_NAME, DOCUMENT_LIBRARY_NAME)
+
+        attended_export_filename = client_number + "_assistant_processes_" + BILLING_CONFIG.sharepoint_minutes_file_date + EXPORT_FILE_EXTENSION
+        unattended_export_filename = client_number + "_unattended_processes_" + BILLING_CONFIG.sharepoint_minutes_file_date + EXPORT_FILE_EXTENSION
         report_filename = client_number + "_runtime_report_" + BILLING_CONFIG.sharepoint_minutes_file_date + ".xlsx"
-        msgraph_instance.upload_file_to_sharepoint(
-                drive_id,
-                BASE_PATH,
-                report_filename,
-                report_datastream,
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-
-def attach_detail_runtime_to_invoice(quickbooks_online_vault: dict[str, str], invoice_json: dict[str, str]|None, report_datastream: io.BytesIO):
+        uploads = [
+            (attended_export_filename, assistant_export_file_stream, EXPORT_CONTENT_TYPE),
+            (unattended_export_filename, unattended_export_file_stream, EXPORT_CONTENT_TYPE),
+            (report_filename, report_datastream, XLSX_CONTENT_TYPE),
+        ]
+
+        # Upload the files to the subfolder concurrently, streaming each in chunks
+        with ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+            futures = [
+                executor.submit(
+                    msgraph_instance.upload_file_to_sharepoint_stream,
+                    drive_id,
+                    BASE_PATH,
+                    filename,
+                    file_stream,
+                    content_type,
+                )
+                for filename, file_stream, content_type in uploads
+            ]
+            for future in futures:
+                future.result()
+
+def attach_detail_runtime_to_invoice(quickbooks_online_instance: quickbooks_online.QuickBooksOnline, invoice_json: dict[str, str]|None, report_datastream: io.BytesIO):
     # Get the invoice ID from the response
     report_datastream.seek(0)
     if invoice_json is None:
@@ -250,13 +376,12 @@ def attach_detail_runtime_to_invoice(quickbooks_online_vault: dict[str, str], in
     invoice_id = invoice_json["Invoice"]["Id"]
     print(f"Invoice ID: {invoice_id}")
 
-    quickbooks_online_instance = quickbooks_online.QuickBooksOnline(quickbooks_online_vault)
     quickbooks_online_instance.upload_attachment(report_datastream, "Runtime Detail.xlsx", "Invoice", invoice_id, content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
     report_datastream.seek(0)
 
     print(f"Attached report to invoice {invoice_id} in QuickBooks Online.")
 
-def generate_invoice(quickbooks_online_vault: dict[str, str], client_number: str, monthly_rate: float, included_minutes: int, consumption_rate: float, total_runtime_prior_month: int, day_to_bill: str, service_type: str, client_type: str, billing_cc: str):
+def generate_invoice(quickbooks_online_instance: quickbooks_online.QuickBooksOnline, quickbooks_customers: dict[str, dict], client_number: str, monthly_rate: float, included_minutes: int, consumption_rate: float, total_runtime_prior_month: int, day_to_bill: str, service_type: str, client_type: str, billing_cc: str):
     # Get the day to bill from the custom field
     current_month_and_year = datetime.now().replace(day=int(day_to_bill))
     formatted_date = current_month_and_year.strftime("%Y-%m-%d")
@@ -282,10 +407,12 @@ def generate_invoice(quickbooks_online_vault: dict[str, str], client_number: str
     overage_item_id = "1010000001"
     overage_item_name = "Runtime Overage Minutes"
 
-    # Get the customer information from QuickBooks Online
-    query_string = f"SELECT * FROM Customer WHERE FullyQualifiedName LIKE'{client_number}%'"
-    quickbooks_online_instance = quickbooks_online.QuickBooksOnline(quickbooks_online_vault)
-    response = quickbooks_online_instance.query_a_customer(query_string)
+    # Get the customer information from the customers fetched once for the run
+    customer = quickbooks_customers.get(client_number)
+    if customer is None:
+        query_string = f"SELECT * FROM Customer WHERE FullyQualifiedName LIKE'{client_number}%'"
+        response = quickbooks_online_instance.query_a_customer(query_string)
+        customer = response["QueryResponse"]["Customer"][0]
 
     # Calculate the overage minutes
     if total_runtime_prior_month > included_minutes:
@@ -326,8 +453,8 @@ def generate_invoice(quickbooks_online_vault: dict[str, str], client_number: str
         "TxnDate": formatted_date,
         "DueDate": due_date,
         "Line": line_items,
-        "CustomerRef": {"value": response["QueryResponse"]["Customer"][0]["Id"]},
-        "BillEmail": {"Address": response["QueryResponse"]["Customer"][0]["PrimaryEmailAddr"]["Address"]},
+        "CustomerRef": {"value": customer["Id"]},
+        "BillEmail": {"Address": customer["PrimaryEmailAddr"]["Address"]},
         "SalesTermRef": {"value": "1"}
     }
 
@@ -342,28 +469,57 @@ def generate_invoice(quickbooks_online_vault: dict[str, str], client_number: str
 
     return invoice_json
 
-def send_data_to_clickup(clickup_vault: dict[str, str], client_number: str, total_runtime_prior_month: int):
-    print(f"Total runtime for {client_number} for prior month: {total_runtime_prior_month} minutes")
+def get_quickbooks_customers_by_account(quickbooks_online_instance: quickbooks_online.QuickBooksOnline) -> dict[str, dict]:
+    # Customers are named "<account #> - <name>", so one paged query replaces a LIKE scan per client
+    customers_by_account = {}
+    start_position = 1
+    while True:
+        query_string = (
+            "SELECT Id, DisplayName, PrimaryEmailAddr, FullyQualifiedName FROM Customer "
+            f"STARTPOSITION {start_position} MAXRESULTS {QBO_QUERY_PAGE_SIZE}"
+        )
+        response = quickbooks_online_instance.query_a_customer(query_string)
+        customers = response.get("QueryResponse", {}).get("Customer", [])
+        for customer in customers:
+            customers_by_account.setdefault(customer["FullyQualifiedName"].split(" ")[0], customer)
+        if len(customers) < QBO_QUERY_PAGE_SIZE:
+            break
+        start_position += QBO_QUERY_PAGE_SIZE
+
+    logging.info(f"Loaded {len(customers_by_account)} QuickBooks Online customers")
+    return customers_by_account
 
+def get_clickup_organizations_by_account(clickup_vault: dict[str, str], account_numbers: list[str]) -> dict[str, dict]:
     list_id = clickup_vault["CRM_Business_List"]
     special_custom_field_id = clickup_vault["CRM_Business_List_Ac_Num_Query"] # This is the custom field id for "Account #" so we can filter using query params
 
-    query_parameters={
-            "custom_fields": [{
-                "field_id": special_custom_field_id,
-                "operator": "IS NOT NULL"
-            }]
-        }
-    query_parameters["custom_fields"] = json.dumps(query_parameters["custom_fields"])
-
-    tasks_list = clickup.get_tasks(
-        clickup_vault,
-        list_id,
-        query_parameters=query_parameters
-        )
+    # A run over a handful of clients asks ClickUp for just those accounts; a full run pulls the whole list once
+    if len(account_numbers) <= CLICKUP_ACCOUNT_FILTER_LIMIT:
+        custom_field_filters = [
+            [{"field_id": special_custom_field_id, "operator": "=", "value": account_number}]
+            for account_number in account_numbers
+        ]
+    else:
+        custom_field_filters = [[{"field_id": special_custom_field_id, "operator": "IS NOT NULL"}]]
+
+    tasks_list = []
+    for custom_field_filter in custom_field_filters:
+        query_parameters = {"custom_fields": json.dumps(custom_field_filter)}
+        tasks_list.extend(clickup.get_tasks(
+            clickup_vault,
+            list_id,
+            query_parameters=query_parameters
+            ))
+
+    # Index the organizations by "Account #" once so each client is a single lookup
+    organizations_by_account = {}
+    for organization in tasks_list:
+        for custom_field in organization["custom_fields"]:
+            if custom_field["name"] == "Account #":
+                organizations_by_account.setdefault(custom_field["value"], organization)
+    return organizations_by_account
 
-    found_organization = False
-    organization_task_id = None 
+def extract_client_config(organization: dict):
     robocorp_prior_usage_column_id = None
     robocorp_lifetime_usage_column_id = None
     robocorp_lifetime_usage = 0
@@ -375,163 +531,241 @@ def send_data_to_clickup(clickup_vault: dict[str, str], client_number: str, tota
     client_type = None
     billing_cc = None
 
-    for organization in tasks_list:
-        for custom_field in organization["custom_fields"]:
-            if custom_field["name"] == "Account #" and custom_field["value"] == client_number:
-                print(f'clickup task ID: {organization["id"]}, Client ID: {client_number}')
-                print(f'Custom Field ID: {custom_field["id"]}')
-                print(f'Organization Name: {organization["name"]}')
-                organization_task_id = organization["id"]
-                found_organization = True
-                break
-        if found_organization:
-            for custom_field in organization["custom_fields"]:
-                match custom_field["name"]:
-                    case "Robocorp Prior Month":
-                        robocorp_prior_usage_column_id = custom_field["id"]
-                    case "Robocorp Lifetime":
-                        robocorp_lifetime_usage_column_id = custom_field["id"]
-                        robocorp_lifetime_usage = int(custom_field.get("value", 0))
-                    case "Rate":
-                        monthly_rate = int(custom_field.get("value", 0))
-                    case "Included Consumption":
-                        included_minutes = int(custom_field.get("value", 0))
-                    case "Consumption Rate":
-                        consumption_rate = float(custom_field.get("value", 0))
-                    case "Day to Bill":
-                        day_to_bill = int(custom_field.get("value", 0))
-                    case "Service Type":
-                        service_type_index = custom_field.get("value", "")
-                        service_type = custom_field.get("type_config", "").get("options", [])[service_type_index].get("name", "")
-                    case "Type":
-                        client_type_index = custom_field.get("value", "")
-                        client_type = custom_field.get("type_config", "").get("options", [])[client_type_index].get("name", "")
-                    case "Billing CC":
-                        billing_cc = custom_field.get("value", "")
-                    case _:
-                        pass #NOSONAR
-
-            break
+    for custom_field in organization["custom_fields"]:
+        match custom_field["name"]:
+            case "Robocorp Prior Month":
+                robocorp_prior_usage_column_id = custom_field["id"]
+            case "Robocorp Lifetime":
+                robocorp_lifetime_usage_column_id = custom_field["id"]
+                robocorp_lifetime_usage = int(custom_field.get("value", 0))
+            case "Rate":
+                monthly_rate = int(custom_field.get("value", 0))
+            case "Included Consumption":
+                included_minutes = int(custom_field.get("value", 0))
+            case "Consumption Rate":
+                consumption_rate = float(custom_field.get("value", 0))
+            case "Day to Bill":
+                day_to_bill = int(custom_field.get("value", 0))
+            case "Service Type":
+                service_type = custom_field["type_config"]["options"][custom_field["value"]]["name"]
+            case "Type":
+                client_type = custom_field["type_config"]["options"][custom_field["value"]]["name"]
+            case "Billing CC":
+                billing_cc = custom_field.get("value", "")
+            case _:
+                pass #NOSONAR
+
+    return robocorp_prior_usage_column_id, robocorp_lifetime_usage_column_id, robocorp_lifetime_usage, monthly_rate, included_minutes, consumption_rate, day_to_bill, service_type, client_type, billing_cc
+
+def send_data_to_clickup(clickup_vault: dict[str, str], clickup_organizations: dict[str, dict], client_number: str, total_runtime_prior_month: int):
+    print(f"Total runtime for {client_number} for prior month: {total_runtime_prior_month} minutes")
 
-    if not found_organization:
+    organization = clickup_organizations.get(client_number)
+    if organization is not None:
+        print(f'clickup task ID: {organization["id"]}, Client ID: {client_number}')
+        print(f'Organization Name: {organization["name"]}')
+        organization_task_id = organization["id"]
+    else:
         print(f"Organization with client ID {client_number} not found in ClickUp")
         # Send Email to Wes
-        # continue
+        # Fall back to the default configuration
+        organization_task_id = None
+        organization = {"custom_fields": []}
+
+    (
+        robocorp_prior_usage_column_id,
+        robocorp_lifetime_usage_column_id,
+        robocorp_lifetime_usage,
+        monthly_rate,
+        included_minutes,
+        consumption_rate,
+        day_to_bill,
+        service_type,
+        client_type,
+        billing_cc,
+    ) = extract_client_config(organization)
 
     # add total to the lifetime usage
     robocorp_lifetime_usage += total_runtime_prior_month
-    if UPDATE_CLICKUP:
-        clickup.set_custom_field_value(clickup_vault, organization_task_id, robocorp_lifetime_usage_column_id, str(robocorp_lifetime_usage))
     print(f"Total lifetime usage for {client_number}: {robocorp_lifetime_usage} minutes")
 
-    # set prior month usage
+    # set lifetime and prior month usage. The two fields are independent, so write them together.
     if UPDATE_CLICKUP:
-        clickup.set_custom_field_value(clickup_vault, organization_task_id, robocorp_prior_usage_column_id, str(total_runtime_prior_month))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(clickup.set_custom_field_value, clickup_vault, organization_task_id, robocorp_lifetime_usage_column_id, str(robocorp_lifetime_usage)),
+                executor.submit(clickup.set_custom_field_value, clickup_vault, organization_task_id, robocorp_prior_usage_column_id, str(total_runtime_prior_month)),
+            ]
+            for future in futures:
+                future.result()
 
     return organization_task_id, monthly_rate, included_minutes, consumption_rate, day_to_bill, service_type, client_type, billing_cc
 
-def get_unattended_data_from_spreadsheet(unattended_data:pandas.DataFrame, client_number:str, organization_id:str) -> tuple[int, io.BytesIO, str]:  
-    # Filter the data for the Organization ID
-    unattended_data_for_organization:pandas.DataFrame = unattended_data[unattended_data["Organization ID"] == organization_id]
+def get_unattended_data_from_spreadsheet(unattended_data_by_organization:dict[str, pandas.DataFrame], client_number:str, organization_id:str) -> tuple[int, io.BytesIO, str]:  
+    # Look up the rows for the Organization ID; organizations with no runs have no group
+    unattended_data_for_organization:pandas.DataFrame = unattended_data_by_organization.get(organization_id, pandas.DataFrame(columns=UNATTENDED_EXPORT_COLUMNS))
     total_runtime_prior_month_unattended = unattended_data_for_organization['Process total run minutes used'].sum()
     
     #Remove all columns except those needed for export
-    unattended_data_for_organization = unattended_data_for_organization[['Organization ID', 'Organization name', 'Process name', 'Process ID', 'Process total run minutes used', 'Process On-demand run minutes used']]
+    unattended_data_for_organization = unattended_data_for_organization[UNATTENDED_EXPORT_COLUMNS]
     
-    export_file_stream = io.BytesIO()
     if unattended_data_for_organization.empty:
         print(f"No unattended processes found for {client_number}")
         organization_name = ""
-        # Create an empty Excel writer object
-        with pandas.ExcelWriter(export_file_stream, engine="openpyxl") as writer:
-            empty_df = pandas.DataFrame(columns=["Organization ID", "Organization name", "Process name", "Process ID", "Process total run minutes used", "Process On-demand run minutes used"])
-            empty_df.to_excel(writer, index=False, sheet_name="Unattended Processes")
+        # Export an empty sheet with the expected columns
+        empty_df = pandas.DataFrame(columns=UNATTENDED_EXPORT_COLUMNS)
+        export_file_stream = write_raw_export(empty_df, "Unattended Processes")
     else:
         organization_name = unattended_data_for_organization['Organization name'].iloc[0]
-        # Create an Excel writer object
-        with pandas.ExcelWriter(export_file_stream, engine="openpyxl") as writer:
-            unattended_data_for_organization.to_excel(writer, index=False, sheet_name="Unattended Processes")
+        export_file_stream = write_raw_export(unattended_data_for_organization, "Unattended Processes")
 
-    export_file_stream.seek(0)
     return total_runtime_prior_month_unattended, export_file_stream, organization_name
 
-def get_unattended_runs(workspace_id: str, header: dict[str, str]) -> pandas.DataFrame:
+def write_raw_export(dataframe: pandas.DataFrame, sheet_name: str) -> io.BytesIO:
+    # Raw run data is archived as-is, so it can go out as CSV or Parquet; the runtime report stays XLSX for people
+    export_file_stream = io.BytesIO()
+    if EXPORT_FORMAT == "parquet":
+        dataframe.to_parquet(export_file_stream, engine="pyarrow", compression=PARQUET_COMPRESSION, index=False)
+    elif EXPORT_FORMAT == "csv":
+        dataframe.to_csv(export_file_stream, index=False, encoding="utf-8")
+    else:
+        # Excel has no timezone support, so UTC timestamps are written as naive values; CSV and Parquet keep the offset
+        tz_columns = dataframe.select_dtypes(include="datetimetz").columns
+        if not tz_columns.empty:
+            dataframe = dataframe.assign(**{col: dataframe[col].dt.tz_convert(None) for col in tz_columns})
+        # constant_memory flushes each row as soon as the next one starts, so a large export never sits in memory as
+        # a whole sheet of cell objects. It needs rows written in order, which pandas' column-wise to_excel doesn't do.
+        workbook = xlsxwriter.Workbook(export_file_stream, {"constant_memory": True})
+        worksheet = workbook.add_worksheet(sheet_name)
+        date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        worksheet.write_row(0, 0, list(dataframe.columns), workbook.add_format({"bold": True}))
+        # Unbox each column to Python values once and blank out missing values only in columns that have any,
+        # rather than testing every cell as the rows are written
+        column_values = []
+        for column_number, (_, column) in enumerate(dataframe.items()):
+            if pandas.api.types.is_datetime64_any_dtype(column):
+                # Excel stores datetimes as days since 1899-12-30. Convert the whole column here and let the column
+                # format display it, so xlsxwriter writes plain numbers instead of converting each datetime cell.
+                column = (column - EXCEL_EPOCH) / pandas.Timedelta(days=1)
+                worksheet.set_column(column_number, column_number, None, date_format)
+            values = column.tolist()
+            if column.hasnans:
+                values = [None if missing else value for value, missing in zip(values, column.isna().to_numpy())]
+            column_values.append(values)
+        for row_number, row in enumerate(zip(*column_values), start=1):
+            worksheet.write_row(row_number, 0, row)
+        workbook.close()
+    export_file_stream.seek(0)
+    return export_file_stream
+
+def get_unattended_runs(workspace_id: str, header: dict[str, str], step_run_executor: ThreadPoolExecutor) -> pandas.DataFrame:
     print("Getting Unattended Runs")
     url = f"https://cloud.robocorp.com/api/v1/workspaces/{workspace_id}/process-runs"
-    unattended_process_list = []
+    # Only the fields the report uses are kept, appended straight into per-column lists with the process name
+    # pulled out of the nested process dict, so no per-page frames or object columns of raw dicts are built
+    unattended_run_columns = {"id": [], "process_name": [], "started_at": []}
+    # Ask Robocorp for the billing window only, so fewer pages come back
     query_params = {
         "limit": 500,
+        "started_after": BILLING_CONFIG.prior_period_start.isoformat(),
+        "started_before": BILLING_CONFIG.current_period_end.isoformat(),
     }
+    # Convert the window bounds to UTC Timestamps once rather than coercing the datetimes in each comparison
+    window_start = pandas.Timestamp(BILLING_CONFIG.prior_period_start)
+    window_end = pandas.Timestamp(BILLING_CONFIG.current_period_end)
     count = 1
     while url:
         logging.info(f"Fetching unattended process runs page {count}")   
         count += 1
-        response = requests.get(url, headers=header, params=query_params)
-        response_json = response.json()
-        unattended_process_list.extend(response_json.get('data', []))
+        response = ROBOCORP_SESSION.get(url, headers=header, params=query_params, timeout=30)
+        response.raise_for_status()
+        response_json = orjson.loads(response.content)
+        for run in response_json.get('data', []):
+            process = run.get("process")
+            unattended_run_columns["id"].append(run.get("id"))
+            unattended_run_columns["process_name"].append(process.get("name", "") if isinstance(process, dict) else None)
+            unattended_run_columns["started_at"].append(run.get("started_at"))
         url = response_json.get('next') if response_json.get('has_more') else None
-
-    # Convert all_data list to a DataFrame
-    dataframe_unattended_processes = pandas.DataFrame(unattended_process_list)
-    if dataframe_unattended_processes.empty:
+        # The next URL already carries the query, so later pages don't send it again
+        query_params = {}
+
+    # Parse the timestamps in one pass and trim to the prior two months. The window is also sent to the API,
+    # this keeps the result correct if the server returns runs outside of it.
+    dataframe_prior_months_unattended = pandas.DataFrame(unattended_run_columns)
+    dataframe_prior_months_unattended['started_at'] = pandas.to_datetime(dataframe_prior_months_unattended['started_at'], format='ISO8601', utc=True)
+    dataframe_prior_months_unattended = dataframe_prior_months_unattended[
+        dataframe_prior_months_unattended['started_at'].between(window_start, window_end)
+    ]
+    if dataframe_prior_months_unattended.empty:
         print("No unattended processes found.")
         return pandas.DataFrame()
 
-    # Convert the 'started_at' column to a datetime object
-    dataframe_unattended_processes['started_at'] = pandas.to_datetime(dataframe_unattended_processes['started_at'])
-
-    # Initialize the 'runtime' column to 0
-    dataframe_unattended_processes['runtime'] = 0
-    
-    # Filter the DataFrame for rows in the prior two month
-    dataframe_prior_months_unattended = dataframe_unattended_processes[
-        (dataframe_unattended_processes['started_at'] >= BILLING_CONFIG.prior_period_start) &
-        (dataframe_unattended_processes['started_at'] <= BILLING_CONFIG.current_period_end)
-    ]
-    
     # Get the runtime for each process run in the filtered DataFrame using the step duration
-    count = 1
-    for index, row in dataframe_prior_months_unattended.iterrows():
-        logging.info(f"Processing unattended run {count} of {len(dataframe_prior_months_unattended)}")
-        count += 1
-        process_id = row['id']
-        query_params = {
-            "process_run_id": process_id
-        }
-        url = f"https://cloud.robocorp.com/api/v1/workspaces/{workspace_id}/step-runs"
-        unattended_run_list = []
-        while url:
-            try:
-                response = requests.get(url, headers=header, params=query_params)
-            except requests.exceptions.RequestException as e:
-                print(f"Trying again after 15 seconds due to error: {e}")
-                time.sleep(15)
-                response = requests.get(url, headers=header, params=query_params)
-
-            response_json = response.json()
-            unattended_run_list.extend(response_json.get('data', []))
-            url = response_json.get('next') if response_json.get('has_more') else None
-
-        # Each step rounds up to the nearest minute and gets added to the total for the process run
-        rounded_minutes = 0
-        for step in unattended_run_list:
-            if step['duration'] is not None:
-                rounded_minutes = math.ceil(step['duration'] / 60) + rounded_minutes
-        dataframe_prior_months_unattended.at[index, 'runtime'] = rounded_minutes
+    process_run_ids = dataframe_prior_months_unattended['id'].to_numpy()
+    logging.info(f"Fetching step runs for {len(process_run_ids)} unattended runs")
+    # executor.map yields in submission order, so the results line up with the rows positionally
+    runtimes = step_run_executor.map(
+        lambda process_run_id: get_process_run_minutes(workspace_id, process_run_id, header),
+        process_run_ids,
+    )
+    dataframe_prior_months_unattended = dataframe_prior_months_unattended.assign(
+        runtime=numpy.fromiter(runtimes, dtype=numpy.int64, count=len(process_run_ids)),
+    )
 
     return dataframe_prior_months_unattended
 
+def get_step_runs(workspace_id: str, process_run_id: str, header: dict[str, str]) -> list[dict]:
+    query_params = {
+        "process_run_id": process_run_id
+    }
+    url = f"https://cloud.robocorp.com/api/v1/workspaces/{workspace_id}/step-runs"
+    step_run_list = []
+    while url:
+        response = ROBOCORP_SESSION.get(url, headers=header, params=query_params, timeout=30)
+        response.raise_for_status()
+        response_json = orjson.loads(response.content)
+        step_run_list.extend(response_json.get('data', []))
+        url = response_json.get('next') if response_json.get('has_more') else None
+        # The next URL already carries the query, so later pages don't send it again
+        query_params = {}
+
+    return step_run_list
+
+def get_process_run_minutes(workspace_id: str, process_run_id: str, header: dict[str, str]) -> int:
+    # Each step rounds up to the nearest minute and gets added to the total for the process run
+    step_runs = get_step_runs(workspace_id, process_run_id, header)
+    durations = numpy.fromiter(
+        (duration for step in step_runs if (duration := step.get('duration')) is not None),
+        dtype=numpy.float64,
+    )
+    return int(round_up_to_minutes(durations).sum())
+
+def round_up_to_minutes(seconds: numpy.ndarray) -> numpy.ndarray:
+    # Billing rounds every run or step up to a whole minute. Every caller goes through float64 so fractional seconds
+    # round the same way whichever path they come from; negated floor division is ceil(s / 60) as one array op.
+    seconds = numpy.asarray(seconds, dtype=numpy.float64)
+    # A missing duration can't be billed, and a NaN would turn into a garbage count when cast to int
+    if numpy.isnan(seconds).any():
+        raise ValueError("Cannot round a missing duration up to minutes")
+    return (-(-seconds // 60)).astype(numpy.int64)
+
 def build_runtime_report(client_number: str, dataframe_prior_months_unattended: pandas.DataFrame, dataframe_prior_month_assistant: pandas.DataFrame, included_minutes: int, consumption_rate: float):
     
     # check if empty. If not empty, Remove Columns, Rename Columns and merge together. If not, then create empty dataframe with correct columns
     if not dataframe_prior_month_assistant.empty:
-        df_assistant_trimmed = dataframe_prior_month_assistant[["Process Name", "started_at", "runtime"]].copy()
-        df_assistant_trimmed.rename(columns={"Process Name": "Process", "started_at": "Date", "runtime": "Runtime"}, inplace=True)
+        # Assistant runs carry no Process, as in the original report: they appear in Run Data and the daily chart
+        # but stay out of the Usage Pivot and so out of the Overage Calculation total
+        df_assistant_trimmed = pandas.DataFrame({
+            "Process": None,
+            "Date": dataframe_prior_month_assistant["started_at"],
+            "Runtime": dataframe_prior_month_assistant["Process total run minutes used"],
+        })
     else:
         df_assistant_trimmed = pandas.DataFrame(columns=["Process", "Date", "Runtime"])
     if not dataframe_prior_months_unattended.empty:
-        df_unattended_trimmed = dataframe_prior_months_unattended[["process", "started_at", "runtime"]].copy()
-        df_unattended_trimmed.rename(columns={"process": "Process", "started_at": "Date", "runtime": "Runtime"}, inplace=True)
+        df_unattended_trimmed = dataframe_prior_months_unattended[["process_name", "started_at", "runtime"]].rename(
+            columns={"process_name": "Process", "started_at": "Date", "runtime": "Runtime"}
+        )
     else:
         df_unattended_trimmed = pandas.DataFrame(columns=["Process", "Date", "Runtime"])
     df_trimmed = pandas.concat([df_assistant_trimmed, df_unattended_trimmed], ignore_index=True)
@@ -540,107 +774,98 @@ def build_runtime_report(client_number: str, dataframe_prior_months_unattended:
         print("No data to build report.")
         return None
     
-    # Clean up Names and Convert to DateTime
-    def extract_process_name(x: dict[str, str] | str) -> str|None:
-        return x.get("name", "") if isinstance(x, dict) else None
-    df_trimmed["Process"] = df_trimmed["Process"].apply(extract_process_name)
-    
-    df_trimmed["Date"] = pandas.to_datetime(df_trimmed["Date"], utc=True).dt.tz_localize(None).dt.date
-    pivot_table_df = df_trimmed.copy()
-    bar_chart_df = df_trimmed.copy()
-    run_data_df = df_trimmed.copy()
-
-    pivot_table_df["Runtime"] = pandas.to_numeric(pivot_table_df["Runtime"], errors="coerce")
-    pivot_table_df["Month"] = pandas.to_datetime(pivot_table_df["Date"]).dt.to_period("M").astype(str)
-
-    pivot_table = pivot_table_df.pivot_table(
-        index="Process",
-        columns="Month",
-        values="Runtime",
-        aggfunc="sum",
-        fill_value=0
-    ).reset_index()
-    pivot_table.loc["Total"] = pivot_table.sum(numeric_only=True)
-    pivot_table.loc["Total", "Process"] = "Total"
+    # Convert to DateTime
+    dates = pandas.to_datetime(df_trimmed["Date"], format="ISO8601", utc=True).dt.tz_localize(None)
+    # Replace and add the derived columns in one assign rather than one setitem each
+    df_trimmed = df_trimmed.assign(
+        Date=dates.dt.date,
+        Runtime=pandas.to_numeric(df_trimmed["Runtime"], errors="coerce"),
+        # Month and Day feed both the pivot and the bar chart, so derive them once
+        # Truncating to datetime64[M] in NumPy gives the same "YYYY-MM" labels as to_period("M") without building Period objects
+        Month=dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]").astype(str),
+        Day=dates.dt.day,
+    )
+
+    # Aggregate once at the finest grain; the pivot and the daily summary are both roll-ups of it.
+    # Rows without a Process are kept here for the daily summary; the pivot's level groupby drops them.
+    grouped_runtime = df_trimmed.groupby(["Process", "Month", "Day"], sort=False, observed=True, dropna=False)["Runtime"].sum()
+
+    pivot_table = grouped_runtime.groupby(level=["Process", "Month"]).sum().unstack("Month", fill_value=0).reset_index()
+    # The Total row is appended to the sheet after writing, so the pivot frame keeps integer month columns
+    # instead of being upcast by a row holding the "Total" label
+    pivot_totals = pivot_table[pivot_table.columns[1:]].sum()
     # Get the total from the rightmost column (last month)
     rightmost_col = pivot_table.columns[-1]
-    total_previous_month_runtime_data = pivot_table.loc[pivot_table["Process"] == "Total", rightmost_col]
-    total_prior_month = total_previous_month_runtime_data.values[0] if not total_previous_month_runtime_data.empty else 0
+    # A client with only assistant runs has no month columns in the pivot, so nothing to total
+    total_prior_month = pivot_totals.get(rightmost_col, 0)
     
     print(f"Total from the prior month ({rightmost_col}): {total_prior_month}")
 
     # Prepare Bar Chart Data for the last two months
-    bar_chart_df["Month"] = pandas.to_datetime(bar_chart_df["Date"]).dt.to_period("M").astype(str)
-    bar_chart_df["Day"] = pandas.to_datetime(bar_chart_df["Date"]).dt.day
-    daily_summary = bar_chart_df.groupby(["Day", "Month"])["Runtime"].sum().unstack(fill_value=0).reset_index()
+    daily_summary = grouped_runtime.groupby(level=["Day", "Month"]).sum().unstack("Month", fill_value=0).reset_index()
 
-    # Create a new Excel file with sheets
+    # Create a new Excel file with sheets. The workbook is finished in memory and serialized once when the writer closes.
     report_data_stream = io.BytesIO()
     with pandas.ExcelWriter(report_data_stream, engine="openpyxl") as writer:
-        pivot_table.to_excel(writer, index=False, sheet_name="Usage Pivot")
-        daily_summary.to_excel(writer, index=False, sheet_name="Two Month Run Compare")
-        run_data_df.to_excel(writer, index=False, sheet_name="Run Data")
-    
-    if total_prior_month > 0:
-        add_overage_calculation_sheet(included_minutes, consumption_rate, total_prior_month, report_data_stream)
-    report_data_stream.seek(0)
-    
-    final_data_stream = build_monthly_graph(daily_summary, report_data_stream)
+        for sheet_name, sheet_data in (
+            ("Usage Pivot", pivot_table),
+            ("Two Month Run Compare", daily_summary),
+            ("Run Data", df_trimmed[["Process", "Date", "Runtime"]]),
+        ):
+            sheet_data.to_excel(writer, index=False, sheet_name=sheet_name)
+            autosize_columns(writer.sheets[sheet_name], sheet_data)
+
+        ws_pivot = writer.sheets["Usage Pivot"]
+        ws_pivot.append(["Total", *pivot_totals.tolist()])
+        for column, total in enumerate(pivot_totals.tolist(), start=2):
+            column_dimension = ws_pivot.column_dimensions[get_column_letter(column)]
+            column_dimension.width = max(column_dimension.width, len(str(total)) + 2)
+
+        if total_prior_month > 0:
+            add_overage_calculation_sheet(included_minutes, consumption_rate, total_prior_month, writer.book)
 
-    return final_data_stream
+        build_monthly_graph(daily_summary, writer.book)
 
-def add_overage_calculation_sheet(included_minutes: int, consumption_rate: float, total_prior_month: int, report_data_stream: io.BytesIO):
     report_data_stream.seek(0)
-    wb = load_workbook(report_data_stream)
-    wb.create_sheet("Overage Calculation")
-    ws = wb["Overage Calculation"]
-    last_row = 1
-    ws.cell(row=last_row, column=1, value="Prior Month Total Runtime")
-    ws.cell(row=last_row, column=2, value=total_prior_month)
-    ws.cell(row=last_row + 1, column=1, value="Included Minutes")
-    ws.cell(row=last_row + 1, column=2, value=included_minutes)
-    ws.cell(row=last_row + 2, column=1, value="Overage Minutes")
+    return report_data_stream
+
+def autosize_columns(ws, dataframe: pandas.DataFrame):
+    # Size from the DataFrame that was just written instead of reading every cell back out of the sheet
+    for column, name in enumerate(dataframe.columns, start=1):
+        values = dataframe[name].dropna()
+        max_length = max(len(str(name)), int(values.astype(str).str.len().max()) if not values.empty else 0)
+        ws.column_dimensions[get_column_letter(column)].width = max_length + 2  # Add a little extra padding
+
+def add_overage_calculation_sheet(included_minutes: int, consumption_rate: float, total_prior_month: int, wb: Workbook):
+    ws = wb.create_sheet("Overage Calculation")
     overage_minutes = total_prior_month - included_minutes if int(total_prior_month) > int(included_minutes) else 0
-    ws.cell(row=last_row + 2, column=2, value=overage_minutes)
-    ws.cell(row=last_row + 3, column=1, value="Consumption Rate")
-    ws.cell(row=last_row + 3, column=2, value=consumption_rate)
-    ws.cell(row=last_row + 4, column=1, value="Total Overage Cost")
     total_cost = overage_minutes * consumption_rate
-    ws.cell(row=last_row + 4, column=2, value=total_cost)
+    overage_rows = [
+        ("Prior Month Total Runtime", total_prior_month),
+        ("Included Minutes", included_minutes),
+        ("Overage Minutes", overage_minutes),
+        ("Consumption Rate", consumption_rate),
+        ("Total Overage Cost", total_cost),
+    ]
+    for row in overage_rows:
+        ws.append(row)
+    for column, col_values in enumerate(zip(*overage_rows), start=1):
+        ws.column_dimensions[get_column_letter(column)].width = max(len(str(value)) for value in col_values) + 2
     print(f"Prior Month Total Runtime: {total_prior_month}")
     print(f"Included Minutes: {included_minutes}")
     print(f"Overage Minutes: {overage_minutes}")
     print(f"Consumption Rate: {consumption_rate}")
     print(f"Total Overage Cost: {total_cost}")
-    wb.save(report_data_stream)
 
-def build_monthly_graph(daily_summary: pandas.DataFrame, report_data_stream: io.BytesIO):
-    report_data_stream.seek(0)
-    wb = load_workbook(report_data_stream)
-
-    #Autosize columns in all sheets
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column  # Excel column index (1-based)
-            column_letter = get_column_letter(column)
-            for cell in col:
-                try:
-                    cell_value = str(cell.value)
-                    if cell_value:
-                        max_length = max(max_length, len(cell_value))
-                except:
-                    pass
-            adjusted_width = max_length + 2  # Add a little extra padding
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
+def build_monthly_graph(daily_summary: pandas.DataFrame, wb: Workbook):
+
     # Bold the "Total" row in the "Usage Pivot" sheet
     ws_pivot = wb["Usage Pivot"]
-    for cell in ws_pivot.iter_rows(min_row=ws_pivot.max_row, max_row=ws_pivot.max_row):
-        for c in cell:
-            c.font = Font(bold=True)
-            c.border = Border(top=Side(style="thin"))
+    total_font = Font(bold=True)
+    total_border = Border(top=Side(style="thin"))
+    for c in ws_pivot[ws_pivot.max_row]:
+        c.font = total_font
+        c.border = total_border
 
     # Add a Bar Chart
     ws_graph = wb["Two Month Run Compare"]
@@ -680,88 +905,96 @@ def build_monthly_graph(daily_summary: pandas.DataFrame, report_data_stream: io.
     chart.add_data(data, titles_from_data=True)
     chart.set_categories(cats)
     ws_graph.add_chart(chart)
-    
-    # Save the workbook to a stream
-    final_stream = io.BytesIO()
-    wb.save(final_stream)
-    final_stream.seek(0)
 
-    return final_stream
-
-def get_assistant_runs(last_day_of_prior_month: str, first_day_of_prior_month: str, workspace_id: str, header: dict[str, str], organization_name: str) -> tuple[int, io.BytesIO, pandas.DataFrame]:
+def get_assistant_runs(last_day_of_prior_month: datetime, first_day_of_prior_month: datetime, workspace_id: str, header: dict[str, str], organization_name: str) -> tuple[int, io.BytesIO, pandas.DataFrame]:
     print("Getting Assistant Runs")
     excel_stream = io.BytesIO()
     query_params = {
         "limit": 500,
     }
     url = f"https://cloud.robocorp.com/api/v1/workspaces/{workspace_id}/assistant-runs"
-    assistant_run_list = []
+    # Each page's cursor comes from the previous response, so pages are fetched in order over the pooled session.
+    # Only the fields the report uses are kept, appended straight into per-column lists with the nested assistant
+    # id and name flattened, so the raw run dicts are dropped page by page and never become object columns.
+    assistant_run_columns = {"started_at": [], "duration": [], "Process ID": [], "Process Name": []}
+    # The endpoint returns the whole run history, so drop runs by their ISO-8601 date prefix before anything is
+    # parsed. The day either side absorbs any UTC offset; the exact window is applied after parsing below.
+    earliest_run_day = (first_day_of_prior_month - relativedelta(days=1)).strftime("%Y-%m-%d")
+    latest_run_day = (last_day_of_prior_month + relativedelta(days=1)).strftime("%Y-%m-%d")
     while url:
-        response = requests.get(url, headers=header, params=query_params)
-        response_json = response.json()
-        assistant_run_list.extend(response_json.get('data', []))
+        response = ROBOCORP_SESSION.get(url, headers=header, params=query_params, timeout=30)
+        response.raise_for_status()
+        response_json = orjson.loads(response.content)
+        for run in response_json.get('data', []):
+            if not earliest_run_day <= (run.get("started_at") or "")[:10] <= latest_run_day:
+                continue
+            assistant = run.get("assistant") or {}
+            assistant_run_columns["started_at"].append(run.get("started_at"))
+            assistant_run_columns["duration"].append(run.get("duration"))
+            assistant_run_columns["Process ID"].append(assistant.get("id"))
+            assistant_run_columns["Process Name"].append(assistant.get("name"))
         url = response_json.get('next') if response_json.get('has_more') else None
+        # The next URL already carries the query, so later pages don't send it again
+        query_params = {}
 
-    # Convert all_data list to a DataFrame
-    dataframe_assistant_runs = pandas.DataFrame(assistant_run_list)
+    dataframe_assistant_runs = pandas.DataFrame(assistant_run_columns)
     
     if dataframe_assistant_runs.empty:
         print("No Assistant runs found.")
         return 0, excel_stream, pandas.DataFrame()
 
-    # Extract 'id' and 'name' from the 'assistant' column and create new columns
-    def extract_process_info(x: dict[str, str] | str) -> tuple[str|None, str|None]:
-        if isinstance(x, dict):
-            return x.get("id", None), x.get("name", None)
-        return None, None
-    dataframe_assistant_runs['Process ID'], dataframe_assistant_runs['Process Name'] = zip(*dataframe_assistant_runs['assistant'].apply(extract_process_info))
-    
-    # Initialize columns
-    dataframe_assistant_runs['Organization name'] = organization_name
-    dataframe_assistant_runs['Organization ID'] = workspace_id
-    dataframe_assistant_runs['started_at'] = pandas.to_datetime(dataframe_assistant_runs['started_at'])
-
-    # Filter the DataFrame for rows in the prior month and with state "completed"
-    dataframe_prior_month_assistant = dataframe_assistant_runs[
-        (dataframe_assistant_runs['started_at'] >= first_day_of_prior_month) &
-        (dataframe_assistant_runs['started_at'] <= last_day_of_prior_month)
-    ].copy()
+    # Filter the DataFrame for rows in the prior month first so the enrichment below only touches kept rows.
+    # Only runs from around the window reach this parse.
+    dataframe_assistant_runs['started_at'] = pandas.to_datetime(dataframe_assistant_runs['started_at'], format='ISO8601', utc=True)
+    # The bounds are UTC datetimes; as Timestamps they compare against the tz-aware column without per-call coercion
+    dataframe_prior_month_assistant = dataframe_assistant_runs.loc[
+        dataframe_assistant_runs['started_at'].between(
+            pandas.Timestamp(first_day_of_prior_month),
+            pandas.Timestamp(last_day_of_prior_month),
+        )
+    ]
 
     if dataframe_prior_month_assistant.empty:
         print("No Assistant runs found for the prior month.")
         return 0, excel_stream, pandas.DataFrame()
 
-    # Round the durations up to the nearest minute and assign it to the Process total run minutes used column
-    def round_up_to_minute(x: int) -> int:
-        return math.ceil(x / 60)
-    rounded_minutes = dataframe_prior_month_assistant['duration'].apply(round_up_to_minute)
-    dataframe_prior_month_assistant['Process total run minutes used'] = rounded_minutes
-    dataframe_prior_month_assistant['runtime'] = rounded_minutes
+    # Round the durations up to the nearest minute. Durations can be fractional seconds, so they are read as float64;
+    # round_up_to_minutes raises on a run without a duration rather than let a NaN reach the minute count
+    durations = dataframe_prior_month_assistant['duration'].to_numpy(dtype=numpy.float64)
+    rounded_minutes = round_up_to_minutes(durations)
+
+    # Build the output frame in one constructor from the filtered columns instead of growing the filtered slice column by column.
+    # It holds only the export columns; the report reads the rounded minutes from the same column as the export.
+    dataframe_prior_month_assistant = pandas.DataFrame({
+        'Organization ID': workspace_id,
+        'Organization name': organization_name,
+        'Process ID': dataframe_prior_month_assistant['Process ID'],
+        'Process Name': dataframe_prior_month_assistant['Process Name'],
+        'started_at': dataframe_prior_month_assistant['started_at'],
+        'duration': dataframe_prior_month_assistant['duration'],
+        'Process total run minutes used': rounded_minutes,
+    })
 
     # Sum the Process total run minutes used for these filtered rows
-    total_runtime_prior_month_assistant = dataframe_prior_month_assistant['Process total run minutes used'].sum()
-
-    # Convert timezone-aware datetime columns to naive datetime
-    for col in dataframe_prior_month_assistant.columns:
-        if pandas.api.types.is_datetime64_any_dtype(dataframe_prior_month_assistant[col]):
-            series = dataframe_prior_month_assistant[col]
-            if hasattr(series.dt, 'tz') and series.dt.tz is not None:  # type: ignore
-                dataframe_prior_month_assistant[col] = series.dt.tz_localize(None)  # type: ignore
-
+    total_runtime_prior_month_assistant = int(rounded_minutes.sum())
 
-    with pandas.ExcelWriter(excel_stream, engine='xlsxwriter') as writer:
-        dataframe_prior_month_assistant.to_excel(writer, index=False, sheet_name='Assistant Runs')
 
-    excel_stream.seek(0)    
+    # Only the billing columns go to SharePoint; the raw nested API fields were never kept
+    excel_stream = write_raw_export(dataframe_prior_month_assistant[ASSISTANT_EXPORT_COLUMNS], 'Assistant Runs')
     return total_runtime_prior_month_assistant, excel_stream, dataframe_prior_month_assistant
 
 def get_site_id_and_drive_id(msgraph_instance: msgraph.MsGraph, site_name: str, document_library_name: str):
-    #Sharepoint navigation
-    response = msgraph_instance.get_sharepoint_site(site_name)
-    site_id = response.json().get("id")
-    response = msgraph_instance.get_sharepoint_drives(site_id)
-    drive_id = msgraph_instance.get_drive_id_by_name(response.json(), document_library_name)
-    return site_id, drive_id
+    # The site and library are fixed for the run, so look them up once and reuse across clients and Graph sessions
+    with SHAREPOINT_DRIVE_LOCK:
+        cache_key = (site_name, document_library_name)
+        if cache_key not in SHAREPOINT_DRIVE_CACHE:
+            #Sharepoint navigation
+            response = msgraph_instance.get_sharepoint_site(site_name)
+            site_id = orjson.loads(response.content).get("id")
+            response = msgraph_instance.get_sharepoint_drives(site_id)
+            drive_id = msgraph_instance.get_drive_id_by_name(orjson.loads(response.content), document_library_name)
+            SHAREPOINT_DRIVE_CACHE[cache_key] = (site_id, drive_id)
+        return SHAREPOINT_DRIVE_CACHE[cache_key]
 
 def get_unattended_data_from_sharepoint(msgraph_instance:msgraph.MsGraph) -> pandas.DataFrame:
     unattended_spreadsheet = f'account-usage-a4db96d0-2dbb-481e-b35a-4629ff252457-{BILLING_CONFIG.sharepoint_file_date}.csv'
@@ -776,15 +1009,24 @@ def get_unattended_data_from_sharepoint(msgraph_instance:msgraph.MsGraph) -> pan
     _, sub_folder_id = msgraph_instance.get_item_name_starts_with(sub_folder_list_json, SUB_FOLDER_NAME) # Find the Minutes folder
     sub_items_list_json = msgraph_instance.get_items_in_folder(drive_id, sub_folder_id)
     _, sub_folder_id = msgraph_instance.get_item_name_starts_with(sub_items_list_json, "CSV Data") # Find the Minutes folder
-    sub_items_list_json = msgraph_instance.get_items_in_folder(drive_id, sub_folder_id)
-    
-    unattended_file = next((item for item in sub_items_list_json if item["name"] == unattended_spreadsheet), None)
+    # Each folder hop depends on the previous one, but the file name is exact, so fetch it directly
+    # rather than paging through every month's CSV in the folder
+    unattended_file = msgraph_instance.get_item_in_folder_by_name(drive_id, sub_folder_id, unattended_spreadsheet)
     
     if unattended_file:
         download_url = unattended_file["@microsoft.graph.downloadUrl"]
-        response = requests.get(download_url)
-        file_content = io.StringIO(response.content.decode('utf-8'))
-        unattended_data = pandas.read_csv(file_content)
+        # Let the CSV parser read straight off the socket instead of holding the bytes and a decoded copy
+        with msgraph_instance.stream_file_from_sharepoint(download_url) as response:
+            # Parse with pyarrow directly so the text columns are typed as strings during the parse, not cast afterwards
+            unattended_table = pyarrow.csv.read_csv(
+                response.raw,
+                convert_options=pyarrow.csv.ConvertOptions(
+                    include_columns=UNATTENDED_EXPORT_COLUMNS,
+                    column_types={column: pyarrow.string() for column in UNATTENDED_TEXT_COLUMNS},
+                ),
+            )
+        # The connection is back in the pool before the table is converted
+        unattended_data = unattended_table.to_pandas()
     else:
         print(f"File {unattended_spreadsheet} not found in SharePoint.")
         raise Exception(f"File {unattended_spreadsheet} not found in SharePoint.")